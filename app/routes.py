@@ -1,15 +1,20 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Any
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 
 from fastapi import APIRouter, HTTPException, Query
 
-from app.models import FileType, RenameRequest, RenameResponse, RecommendedName
+from app.models import FileType, RenameRequest, RenameResponse, RecommendedName, RecognizedMedia
 from app.services.namer import Namer
-from app.services.recognizer import NameRecognizer
+from app.services.recognizer import NameRecognizer, ParsedName, SeriesKey
 
 transfer_router = APIRouter()
 storage_router = APIRouter()
 
+# 递归重命名时并发识别的线程数
+RECOGNIZE_WORKERS = 8
+
 
 @transfer_router.get("/name", response_model=RecommendedName, summary="查询整理后的名称")
 def query_name(path: str = Query(..., description="文件或目录完整路径"),
@@ -38,27 +43,92 @@ def rename(req: RenameRequest) -> Any:
     if not target.exists():
         return RenameResponse(success=False, message="路径不存在")
 
+    renamed = target.with_name(req.new_name)
     try:
-        target.rename(target.with_name(req.new_name))
+        target.rename(renamed)
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=500, detail=f"重命名失败: {exc}") from exc
 
     # 递归处理子文件（仅媒体文件）时，使用识别+命名
-    if req.recursive and target.is_dir():
-        recognizer = NameRecognizer()
-        namer = Namer()
-        for child in target.with_name(req.new_name).rglob("*"):
-            if child.is_dir():
+    if req.recursive and renamed.is_dir():
+        skipped = _rename_children(renamed)
+        if skipped:
+            names = ", ".join(child.name for child in skipped)
+            return RenameResponse(success=True,
+                                  message=f"重命名完成，{len(skipped)} 个文件因目标名称冲突被跳过: {names}")
+
+    return RenameResponse(success=True, message="重命名完成")
+
+
+def _iter_files(root: Path) -> Iterator[Path]:
+    """
+    os.scandir 遍历，DirEntry 自带类型信息，不必对每个条目再 stat 一次。
+    与 rglob 一致，不进入指向目录的符号链接，并跳过无权限读取的子目录；遍历中途被删除的目录同样跳过。
+    """
+    stack = [os.fspath(root)]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except (PermissionError, FileNotFoundError):
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif not entry.is_dir():
+                    yield Path(entry.path)
+
+
+def _rename_children(root: Path) -> List[Path]:
+    """
+    识别并重命名 root 下的媒体文件，返回因目标名称冲突而跳过的文件。
+    """
+    recognizer = NameRecognizer()
+    namer = Namer()
+    children = [child for child in _iter_files(root) if recognizer.has_media_tokens(child)]
+
+    # 同一部作品的各集只在季/集上不同：每组只识别一次（TMDB + Douban），组内其他文件复用结果。
+    # 文件名解析（anitopy 非线程安全）在当前线程完成，每个文件只解析一次，
+    # 只把 TMDB/Douban 查询放进线程池并发执行，重命名仍按顺序执行
+    groups: Dict[SeriesKey, List[Tuple[Path, ParsedName]]] = {}
+    for child in children:
+        try:
+            parsed = recognizer.parse_filename(child)
+        except Exception:
+            # anitopy 对个别文件名会抛异常，跳过该文件
+            continue
+        groups.setdefault(recognizer.series_key(parsed), []).append((child, parsed))
+
+    def lookup(parsed: ParsedName) -> Optional[RecognizedMedia]:
+        try:
+            return recognizer.lookup(parsed)
+        except Exception:
+            # 单组查询失败（网络错误等）视为未识别，不影响其他组的重命名
+            return None
+
+    with ThreadPoolExecutor(max_workers=RECOGNIZE_WORKERS) as pool:
+        bases = list(pool.map(lookup, (members[0][1] for members in groups.values())))
+
+    # POSIX 上 rename 会静默覆盖已有文件：目标已存在或已被本批次其他文件占用时跳过
+    claimed: Set[Path] = set()
+    skipped: List[Path] = []
+    for members, base in zip(groups.values(), bases):
+        if not base:
+            continue
+        for child, parsed in members:
+            media = recognizer.recognize_sibling(base, parsed)
+            new_path = namer.render(media, child)
+            if not new_path or new_path.name == child.name:
                 continue
-            media = recognizer.recognize(child)
-            if not media:
+            dest = child.with_name(new_path.name)
+            if dest in claimed or dest.exists():
+                skipped.append(child)
+                continue
+            claimed.add(dest)
+            try:
+                child.rename(dest)
+            except Exception:
+                # 忽略单个文件错误
                 continue
-            new_path = namer.render(media, child)
-            if new_path and new_path.name != child.name:
-                try:
-                    child.rename(child.with_name(new_path.name))
-                except Exception:
-                    # 忽略单个文件错误
-                    continue
 
-    return RenameResponse(success=True, message="重命名完成")
+    return skipped
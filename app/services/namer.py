@@ -1,3 +1,6 @@
+import os
+import re
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
@@ -5,33 +8,72 @@ from app.core.config import settings
 from app.models import RecognizedMedia, MediaType
 
 
+# "/" 是路径分隔符，标题中出现时（如 "Fate/Zero"）会被当成目录，其余字符保持原样
+_ILLEGAL_CHARS = str.maketrans("", "", "/")
+
+
+@lru_cache(maxsize=4096)
+def _sanitize(name: str) -> str:
+    # 同一部剧的各集标题相同，批量渲染时基本都能命中缓存
+    return name.translate(_ILLEGAL_CHARS)
+
+
+_PLACEHOLDER_RE = re.compile(r"\{\{\{\{([A-Za-z_]\w*)\}\}\}\}")
+
+
+@lru_cache(maxsize=32)
+def _compile_template(template: str) -> str:
+    """
+    把 {{title}} 风格的模板一次性转换为 str.format_map 可用的格式串，渲染时只需单次格式化。
+    """
+    # 先转义模板中原有的花括号，再把 {{name}}（转义后为 {{{{name}}}}）还原成 {name}
+    escaped = template.replace("{", "{{").replace("}", "}}")
+    return _PLACEHOLDER_RE.sub(r"{\1}", escaped)
+
+
+class _Placeholders(dict):
+    # 未知占位符原样保留，与逐个 replace 的行为一致
+    def __missing__(self, key: str) -> str:
+        return "{{" + key + "}}"
+
+
+def _last_segment(rendered: str) -> str:
+    # 与 Path(rendered).name 一致：取最后一段，忽略末尾的 "/"（如 "{{title}}/"）
+    return os.path.basename(rendered.rstrip("/"))
+
+
 class Namer:
     """
     根据识别结果渲染推荐路径/名称。
     简单模板：{{title}} {{year}}，剧集包含 Season/Episode。
     """
 
+    @staticmethod
+    def sanitize_filename(name: str) -> str:
+        return _sanitize(name)
+
     def render(self, media: RecognizedMedia, original_path: Path) -> Optional[Path]:
+        # 在 str 上拼接，最后只构造一次 Path
+        parent = os.path.dirname(original_path)
+        suffix = original_path.suffix
+        values = _Placeholders(title=self.sanitize_filename(media.title), year=str(media.year or ""))
         if media.media_type == MediaType.movie:
-            name = settings.RENAME_MOVIE_FORMAT \
-                .replace("{{title}}", media.title) \
-                .replace("{{year}}", str(media.year or "")) \
-                .strip()
-            return original_path.with_name(f"{name}{original_path.suffix}")
+            name = _compile_template(settings.RENAME_MOVIE_FORMAT).format_map(values).strip()
+            new_filename = _last_segment(name)
+            if not new_filename:
+                return None
+            return Path(os.path.join(parent, new_filename + suffix))
 
         # TV
-        season = f"{(media.season or 1):02d}"
-        episode = f"{(media.episode or 1):02d}"
-        tmpl = settings.RENAME_TV_FORMAT \
-            .replace("{{title}}", media.title) \
-            .replace("{{year}}", str(media.year or "")) \
-            .replace("{{season}}", season) \
-            .replace("{{episode}}", episode) \
-            .strip()
+        values["season"] = f"{(media.season or 1):02d}"
+        values["episode"] = f"{(media.episode or 1):02d}"
+        tmpl = _compile_template(settings.RENAME_TV_FORMAT).format_map(values).strip()
 
+        new_filename = _last_segment(tmpl)
+        if not new_filename:
+            return None
         if original_path.is_dir():
-            return original_path.with_name(Path(tmpl).name)
+            return Path(os.path.join(parent, new_filename))
 
         # For files, only use filename part; directory structure is up to caller.
-        new_filename = Path(tmpl).name
-        return original_path.with_name(f"{new_filename}{original_path.suffix}")
+        return Path(os.path.join(parent, new_filename + suffix))
@@ -1,11 +1,17 @@
 import re
+import threading
+import time
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 import anitopy
+import orjson
 import requests
 from dateutil.parser import parse as date_parse
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
 
 from app.core.config import settings
 from app.models import MediaType, RecognizedMedia
@@ -16,8 +22,30 @@ TMDB_SEARCH_TV = "https://api.themoviedb.org/3/search/tv"
 
 DOUBAN_SEARCH = "https://frodo.douban.com/api/v2/search"
 
-
-@dataclass
+# TMDB 搜索结果缓存有效期（秒）
+TMDB_CACHE_TTL = 3600
+
+# 复用 keep-alive 连接，批量识别时不必每次都重新 TCP/TLS 握手；限流/5xx 自动退避重试。
+# 读超时不重试、连接失败只重试一次，避免单次查询因 timeout=10 叠加重试而阻塞数十秒
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_maxsize=16,
+    max_retries=Retry(total=3, connect=1, read=False, backoff_factor=0.2,
+                      status_forcelist=(429, 500, 502, 503, 504), raise_on_status=False),
+))
+
+# 一次扫描同时提取 SxxEyy / 年份 / 单独季号；单独季号只消费 S 本身（数字放在前瞻里），避免吞掉紧随其后的年份。
+# 年份前面不能是数字（排除 "12019"），后面不做限制，以保留 "20190512" 这类日期命名中的年份；
+# 单独季号要求 S 前不是字母（避免 "Movies2019" 被识别成第 20 季）。
+_TOKEN_RE = re.compile(
+    r"(?P<tv>[Ss](?P<season>\d{1,2})[Ee](?P<episode>\d{1,3}))"
+    r"|(?<!\d)(?P<year>(?:19|20)\d{2})"
+    r"|(?<![A-Za-z])[Ss](?=(?P<season_only>\d{1,2})(?!\d))",
+    re.ASCII,
+)
+
+
+@dataclass(frozen=True, slots=True)
 class ParsedName:
     title: str
     year: Optional[int] = None
@@ -26,6 +54,71 @@ class ParsedName:
     media_type: Optional[MediaType] = None
 
 
+# 同一部作品的识别结果只取决于 (title, year, media_type)
+SeriesKey = Tuple[str, Optional[int], Optional[MediaType]]
+
+_ANITOPY_LOCK = threading.Lock()
+
+
+@lru_cache(maxsize=4096)
+def _parse_name(name: str) -> ParsedName:
+    """
+    解析结果只取决于 basename，按文件名缓存，重复查询/同名文件直接命中。
+    """
+    # anitopy 使用模块级的 Elements/Tokens 单例，并发解析会互相覆盖
+    with _ANITOPY_LOCK:
+        tokens = anitopy.parse(name)
+    title = tokens.get("anime_title") or tokens.get("title") or Path(name).stem
+    year = None
+    season = None
+    episode = None
+    season_only = None
+
+    for match in _TOKEN_RE.finditer(name):
+        if match.group("tv"):
+            # 提取 SxxEyy
+            if episode is None:
+                season = int(match.group("season"))
+                episode = int(match.group("episode"))
+        elif match.group("year"):
+            # 提取年份
+            if year is None:
+                year = int(match.group("year"))
+        elif season_only is None:
+            # 额外兼容 - S01 - 02
+            season_only = int(match.group("season_only"))
+
+    if season_only is not None and not season:
+        season = season_only
+
+    media_type = MediaType.tv if season or episode else MediaType.movie
+    return ParsedName(title=title, year=year, season=season, episode=episode, media_type=media_type)
+
+
+@lru_cache(maxsize=2048)
+def _tmdb_search(title: str, year: Optional[int], media_type: Optional[MediaType],
+                 ttl_bucket: int) -> Optional[dict]:
+    """
+    同一部剧的各集只在季/集上不同，按 (title, year, media_type) 缓存，整季只查询一次 TMDB。
+    ttl_bucket 每 TMDB_CACHE_TTL 秒变化一次，旧条目随之失效（新上映/刚补全的条目最迟一个周期后可见）。
+    请求失败时抛出异常，不会写入缓存。
+    """
+    params = {
+        "api_key": settings.TMDB_API_KEY,
+        "query": title,
+        "language": "zh-CN",
+    }
+    if year:
+        params["year"] = year
+
+    url = TMDB_SEARCH_TV if media_type == MediaType.tv else TMDB_SEARCH_MOVIE
+    resp = _SESSION.get(url, params=params, timeout=10)
+    resp.raise_for_status()
+    data = orjson.loads(resp.content)
+    results = data.get("results") or []
+    return results[0] if results else None
+
+
 class NameRecognizer:
     """
     1) 本地文件名解析（anitopy + 正则）得到 title/year/season/episode
@@ -38,47 +131,33 @@ class NameRecognizer:
             raise ValueError("TMDB_API_KEY is required")
 
     @staticmethod
-    def _parse_filename(path: Path) -> ParsedName:
-        tokens = anitopy.parse(path.name)
-        title = tokens.get("anime_title") or tokens.get("title") or path.stem
-        year = None
-        season = None
-        episode = None
-
-        # 提取年份
-        match_year = re.search(r"(19|20)\d{2}", path.name)
-        if match_year:
-            year = int(match_year.group())
-
-        # 提取 SxxEyy
-        match_tv = re.search(r"[Ss](\d{1,2})[Ee](\d{1,3})", path.name)
-        if match_tv:
-            season = int(match_tv.group(1))
-            episode = int(match_tv.group(2))
-
-        # 额外兼容 - S01 - 02
-        match_season_only = re.search(r"[Ss](\d{1,2})", path.name)
-        if match_season_only and not season:
-            season = int(match_season_only.group(1))
-
-        media_type = MediaType.tv if season or episode else MediaType.movie
-        return ParsedName(title=title, year=year, season=season, episode=episode, media_type=media_type)
+    def parse_filename(path: Path) -> ParsedName:
+        return _parse_name(path.name)
 
-    def _tmdb_search(self, parsed: ParsedName) -> Optional[dict]:
-        params = {
-            "api_key": settings.TMDB_API_KEY,
-            "query": parsed.title,
-            "language": "zh-CN",
-        }
-        if parsed.year:
-            params["year"] = parsed.year
+    @staticmethod
+    def has_media_tokens(path: Path) -> bool:
+        """
+        批量处理前的廉价预过滤：文件名中没有年份/季/集信息（海报、nfo、样片等）时无需查询 TMDB。
+        """
+        return _TOKEN_RE.search(path.name) is not None
 
-        url = TMDB_SEARCH_TV if parsed.media_type == MediaType.tv else TMDB_SEARCH_MOVIE
-        resp = requests.get(url, params=params, timeout=10)
-        resp.raise_for_status()
-        data = resp.json()
-        results = data.get("results") or []
-        return results[0] if results else None
+    @staticmethod
+    def series_key(parsed: ParsedName) -> SeriesKey:
+        """
+        识别结果中除季/集外的字段只取决于 (title, year, media_type)，key 相同的文件可共用一次识别。
+        """
+        return parsed.title, parsed.year, parsed.media_type
+
+    @staticmethod
+    def recognize_sibling(media: RecognizedMedia, parsed: ParsedName) -> RecognizedMedia:
+        """
+        复用同一 series_key 下其他文件的识别结果，只按当前文件的解析结果更新季/集。
+        """
+        return media.model_copy(update={"season": parsed.season, "episode": parsed.episode})
+
+    def _tmdb_search(self, parsed: ParsedName) -> Optional[dict]:
+        ttl_bucket = int(time.monotonic() // TMDB_CACHE_TTL)
+        return _tmdb_search(parsed.title, parsed.year, parsed.media_type, ttl_bucket)
 
     def _douban_search(self, parsed: ParsedName) -> Optional[dict]:
         if not settings.DOUBAN_COOKIE:
@@ -88,10 +167,10 @@ class NameRecognizer:
             "Cookie": settings.DOUBAN_COOKIE,
         }
         params = {"q": parsed.title}
-        resp = requests.get(DOUBAN_SEARCH, headers=headers, params=params, timeout=10)
+        resp = _SESSION.get(DOUBAN_SEARCH, headers=headers, params=params, timeout=10)
         if resp.status_code != 200:
             return None
-        data = resp.json()
+        data = orjson.loads(resp.content)
         items = data.get("subjects") or data.get("items") or []
         return items[0] if items else None
 
@@ -106,7 +185,12 @@ class NameRecognizer:
             return parsed.year
 
     def recognize(self, path: Path) -> Optional[RecognizedMedia]:
-        parsed = self._parse_filename(path)
+        return self.lookup(self.parse_filename(path))
+
+    def lookup(self, parsed: ParsedName) -> Optional[RecognizedMedia]:
+        """
+        只做 TMDB/Douban 查询，不解析文件名，可以放到线程池中并发执行。
+        """
         tmdb_obj = self._tmdb_search(parsed)
         if not tmdb_obj:
             return None